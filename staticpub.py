@@ -5,42 +5,121 @@ A Static ActivityPub generator
 
 import argparse
 import datetime
-import json
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser, ExtendedInterpolation
+from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
 from os.path import curdir
 from pathlib import Path
-from typing import Dict, Generator, List, NoReturn, TypeAlias, cast
+from types import MappingProxyType
+from typing import (
+    Dict, Generator, Iterable, List, Mapping, NoReturn, Set, Tuple, TypeAlias,
+    cast
+)
+
+import orjson
 
 GenericObjectTypeValues: TypeAlias = (
-    List[str | Dict] | Dict | str | bool | None
+    List[str | Dict] | Tuple[str | Dict, ...] | Dict | str | bool | None
 )
 GenericObjectType: TypeAlias = Dict[str, GenericObjectTypeValues]
+Config: TypeAlias = Mapping[str, Mapping[str, str]]
+
+# Shared (immutable) values, orjson serializes tuples as arrays
+# Endpoints are read by other servers, not humans: no indentation
+ORJSON_OPTIONS = orjson.OPT_APPEND_NEWLINE
+ACTIVITYSTREAMS_CONTEXT = "https://www.w3.org/ns/activitystreams"
+ACTOR_CONTEXT = (ACTIVITYSTREAMS_CONTEXT, "https://w3id.org/security/v1")
+NOTE_CONTEXT = (
+    ACTIVITYSTREAMS_CONTEXT,
+    {"filename": {"@id": "http://schema.org/url", "@type": "@id"}},
+)
+PUBLIC_TO = (f"{ACTIVITYSTREAMS_CONTEXT}#Public",)
+# ActivityStreams2 dates, fixed-width so they sort as plain strings
+PUBLISHED_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+MEDIA_MIMETYPES: Dict[str, str] = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class RunContext:
+    "Values shared by every endpoint, resolved once per run"
+    config: Config
+    current_dir_path: Path
+    instance_files_path: Path
+    entries_path: Path
+    featured_note_path: Path
+    banner_path: Path
+    icon_path: Path
+    domain: str
+    actor_id: str
+    host: str
+    preferred_username: str
+    now: str
 
 
 # Helpers
 def now() -> str:
     "Returns _now_ date in ActivityStreams2 format"
-    return datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-
+    return datetime.datetime.now().strftime(PUBLISHED_FORMAT)
 
-def str_to_datetime(date_str: str) -> datetime.datetime:
-    "Converts now() to datetime"
-    return datetime.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
 
-
-def get_config(cur_dir: Path, instance_config_file: str) -> ConfigParser:
+def get_config(cur_dir: Path, instance_config_file: str) -> Config:
     "reads Instance config"
     cfg = ConfigParser(interpolation=ExtendedInterpolation())
     cfg.read(str(cur_dir / instance_config_file))
     cfg.read_dict({"Paths": {"curdir": str(cur_dir.absolute())}})
 
-    return cfg
+    # Resolve every ${...} once and freeze the result
+    # (option names are lowercased by ConfigParser, so are the lookups)
+    return MappingProxyType(
+        {
+            section: MappingProxyType(dict(cfg[section]))
+            for section in cfg.sections()
+        }
+    )
+
+
+def get_run_context(config: Config) -> RunContext:
+    "Builds the RunContext from the Instance config"
+    current_dir_path = Path(config["Paths"]["curdir"])
+    return RunContext(
+        config=config,
+        current_dir_path=current_dir_path,
+        instance_files_path=(
+            current_dir_path / config["Paths"]["instancefiles"]
+        ),
+        # resolved, so the featured note can be spotted among the entries
+        entries_path=(current_dir_path / config["Paths"]["entries"]).resolve(),
+        featured_note_path=(
+            current_dir_path / config["Instance"]["featured_note"].strip()
+        ).resolve(),
+        banner_path=current_dir_path / config["Instance"]["banner"],
+        icon_path=current_dir_path / config["Instance"]["icon"],
+        domain=config["Instance"]["domain"],
+        actor_id=config["Instance"]["actor_id"],
+        host=config["Instance"]["host"],
+        preferred_username=config["Actor"]["preferredusername"],
+        now=now(),
+    )
 
 
-def remove_newlines_strip(line: str) -> str:
-    "Removes newlines and spaces"
-    return line.replace("\n", "").strip()
+def getboolean(value: str | None, fallback: bool) -> bool:
+    "Converts a config value to bool, like ConfigParser.getboolean"
+    if value is None:
+        return fallback
+    if value.lower() not in ConfigParser.BOOLEAN_STATES:
+        raise ValueError(f"Not a boolean: {value}")
+    return ConfigParser.BOOLEAN_STATES[value.lower()]
 
 
 def mkdir(path: Path) -> None:
@@ -49,26 +128,30 @@ def mkdir(path: Path) -> None:
 
 
 def copy(orig: Path, dest: Path) -> None:
-    "Copy files"
+    "Copy files (contents only, lets the kernel do the copy when it can)"
     assert orig.is_file()
-    shutil.copy(str(orig.absolute()), str(dest.absolute()))
+    shutil.copyfile(orig, dest / orig.name)
+
+
+def dump(obj: GenericObjectType, path: Path) -> None:
+    "Serializes obj as (compact) JSON into path"
+    path.write_bytes(orjson.dumps(obj, option=ORJSON_OPTIONS))
 
 
 def media_mimetype(filename: str) -> str:
     "Simple mimetype guesser from file extension"
-    _, ext = filename.rsplit(".", 1)
-    if ext == "png":
-        return "image/png"
-    return "image/jpeg"
+    _, _, ext = filename.rpartition(".")
+    return MEDIA_MIMETYPES.get(ext.lower(), "application/octet-stream")
 
 
 # ActivityPub funcs
 def parse_notes(
-    config: ConfigParser, /, pseudo_note_filename: str, pseudo_note: List[str]
+    ctx: RunContext, /, pseudo_note_filename: str, pseudo_note: List[str]
 ) -> NoReturn | GenericObjectType:
     """
     Receives a filename + "pseudo note" and returns an Activity Object
     * It will fail if the header is badly formatted
+    * Notes without a published header get the run's _now_
     Expected:
     ---
     key: value
@@ -77,10 +160,14 @@ def parse_notes(
     this is content
     """
     try:
-        headers_begin, headers_end = [
-            index for index, line in enumerate(pseudo_note)
-            if line.startswith("---")
-        ]
+        # Only the first two markers matter, content may have its own
+        headers_begin, headers_end = islice(
+            (
+                index for index, line in enumerate(pseudo_note)
+                if line.startswith("---")
+            ),
+            2,
+        )
     except ValueError as e:
         print(
             f"[!] Badly formatted headers: {pseudo_note_filename!r} -> {e}"
@@ -89,98 +176,115 @@ def parse_notes(
 
     filename: str = pseudo_note_filename
     note_id, _ = filename.rsplit(".", 1)
-    domain = config["Instance"].get("domain")
     object_note: GenericObjectType = {
-        "@context": [
-            "https://www.w3.org/ns/activitystreams",
-            {"filename": {"@id": "http://schema.org/url", "@type": "@id"}},
-        ],
-        "id": f"{domain}/posts/{note_id}",
-        "to": ["https://www.w3.org/ns/activitystreams#Public"],
+        "@context": NOTE_CONTEXT,
+        "id": f"{ctx.domain}/posts/{note_id}",
+        "to": PUBLIC_TO,
         "sensitive": False,
         "filename": pseudo_note_filename,
     }
     object_note.update(
-        dict(
-            [
-                (key.strip(), value.strip())
-                for key, value in [
-                    remove_newlines_strip(key_value).split(": ")  # no-qa
-                    for key_value in pseudo_note[headers_begin + 1:headers_end]
-                ]
-            ]
-        )
+        {
+            key.strip(): value.strip()
+            for key, value in (
+                key_value.split(": ", 1)
+                for key_value in pseudo_note[headers_begin + 1:headers_end]
+                if key_value.strip()
+            )
+        }
     )
     object_note.update({"content": "".join(pseudo_note[headers_end + 1:])})
 
-    if "published" not in list(object_note.keys()):
-        object_note.update({"published": now()})
+    if "published" not in object_note:
+        object_note.update({"published": ctx.now})
+    else:
+        # Checked (and zero padded) once here, the Outbox sorts on the
+        # raw string and strptime also accepts unpadded fields
+        try:
+            published = datetime.datetime.strptime(
+                cast(str, object_note["published"]), PUBLISHED_FORMAT
+            )
+        except ValueError as e:
+            print(
+                f"[!] Badly formatted published: {pseudo_note_filename!r}"
+                f" -> {e}"
+            )
+            raise
+        object_note["published"] = published.strftime(PUBLISHED_FORMAT)
 
     return object_note
 
 
 def generate_notes(
-    config: ConfigParser,
-    path: Path
+    ctx: RunContext,
+    path: Path,
+    parsed_notes: Mapping[Path, GenericObjectType]
 ) -> Generator[GenericObjectType, None, None]:
-    "Walks the 'entry' directory and parses the 'pseudo notes'"
-    pseudo_notes: Generator[Path, None, None] = path.glob("**/*")
-    for pseudo_note in pseudo_notes:
-        if pseudo_note.is_file() and pseudo_note.name != ".gitkeep":
-            yield parse_notes(
-                config,
-                pseudo_note_filename=pseudo_note.name,
-                pseudo_note=pseudo_note.open("r").readlines()
-            )
+    """
+    Walks the 'entry' directory and parses the 'pseudo notes'
+    * Notes found in parsed_notes (by path) are yielded as they are
+    """
+    # scandir's DirEntry caches the file type from the directory read
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry_path = Path(entry.path)
+            if entry.is_dir(follow_symlinks=False):
+                yield from generate_notes(ctx, entry_path, parsed_notes)
+            elif entry_path in parsed_notes:
+                yield parsed_notes[entry_path]
+            elif entry.is_file() and entry.name != ".gitkeep":
+                yield parse_notes(
+                    ctx,
+                    pseudo_note_filename=entry.name,
+                    pseudo_note=entry_path.read_text(
+                        encoding="utf-8"
+                    ).splitlines(keepends=True)
+                )
 
 
 def generate_create_activity(
-    config: ConfigParser, /, note: GenericObjectType
+    actor_id: str, /, note: GenericObjectType
 ) -> GenericObjectType:
     "Creates 'Create' Activity Type based on the 'Note' types"
     assert note.get("@context", None), "Note has no context?"
-    del note["@context"]
+    # Copy the note (minus its context) so the original stays untouched
+    object_note = {
+        key: value for key, value in note.items() if key != "@context"
+    }
 
-    filename: str = cast(str, note.get("filename"))
-    note_id, _ = filename.rsplit(".", 1)
-    actor_id = config["Instance"].get("actor_id")
-    domain = config["Instance"].get("domain")
+    # The Activity shares the id parse_notes() gave to the Note
     create_object: GenericObjectType = {
-        "id": f"{domain}/posts/{note_id}",
+        "id": note["id"],
         "type": "Create",
         "actor": actor_id,
-        "published": note.get("published", now()),
-        "to": ["https://www.w3.org/ns/activitystreams#Public"],
-        "object": note,
+        "published": note["published"],
+        "to": PUBLIC_TO,
+        "object": object_note,
     }
 
     return create_object
 
 
 # ActivityPub endpoints
-def create_actor(config, /, has_featured_note: bool = False) -> None:
+def create_actor(ctx: RunContext, /, has_featured_note: bool = False) -> None:
     "Creates 'Actor' endpoint"
-    preferred_username = config["Actor"].get("preferredUsername")
-    actor_id = config["Instance"].get("actor_id")
-    domain = config["Instance"].get("domain")
+    config = ctx.config
+    domain = ctx.domain
     actor_object = {
-        "@context": [
-            "https://www.w3.org/ns/activitystreams",
-            "https://w3id.org/security/v1"
-        ],
-        "id": actor_id,
+        "@context": ACTOR_CONTEXT,
+        "id": ctx.actor_id,
         "type": "Person",
         "following": f"{domain}/following",
         "followers": f"{domain}/followers",
         "inbox": f"{domain}/inbox",
         "outbox": f"{domain}/outbox",
-        "preferredUsername": preferred_username,
+        "preferredUsername": ctx.preferred_username,
         "name": config["Actor"].get("name"),
         "summary": config["Actor"].get("summary"),
-        "url": config["Instance"].get("domain"),
+        "url": domain,
         "manuallyApprovesFollowers": True,
-        "discoverable": config["Actor"].getboolean(
-            "discoverable", fallback=True
+        "discoverable": getboolean(
+            config["Actor"].get("discoverable"), fallback=True
         ),
         "published": "2023-02-09T00:00:00Z",
     }
@@ -192,10 +296,7 @@ def create_actor(config, /, has_featured_note: bool = False) -> None:
             }
         )
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    banner_path = Path(config["Instance"].get("banner"))
+    banner_path = ctx.banner_path
     if banner_path.is_file():
         actor_object.update({
             "image": {
@@ -204,9 +305,9 @@ def create_actor(config, /, has_featured_note: bool = False) -> None:
                 "url": f"{domain}/{banner_path.name}"
             }
         })
-        copy(banner_path, instance_files_path)
+        copy(banner_path, ctx.instance_files_path)
 
-    icon_path = Path(config["Instance"].get("icon"))
+    icon_path = ctx.icon_path
     if banner_path.is_file():
         actor_object.update({
             "icon": {
@@ -215,205 +316,183 @@ def create_actor(config, /, has_featured_note: bool = False) -> None:
                 "url": f"{domain}/{icon_path.name}"
             }
         })
-        copy(icon_path, instance_files_path)
+        copy(icon_path, ctx.instance_files_path)
 
-    with (instance_files_path / f"{preferred_username}").open(
-        "w", encoding="utf-8"
-    ) as actor_fileobj:
-        json.dump(actor_object, actor_fileobj, indent=2)
+    dump(actor_object, ctx.instance_files_path / ctx.preferred_username)
 
 
-def create_webfinger(config) -> None:
+def create_webfinger(ctx: RunContext) -> None:
     "Creates 'Webfinger' endpoint"
-    host = config["Instance"].get("host")
-    preferred_username = config["Actor"].get("preferredUsername")
     webfinger = {
-        "subject": f"acct:{preferred_username}@{host}",
+        "subject": f"acct:{ctx.preferred_username}@{ctx.host}",
         "links": [
             {
                 "rel": "self",
                 "type": "application/activity+json",
-                "href": config["Instance"].get("actor_id"),
+                "href": ctx.actor_id,
             }
         ],
     }
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    well_known = instance_files_path / ".well-known"
-    with (well_known / "webfinger").open(
-        "w", encoding="utf-8"
-    ) as webfinger_fileobj:
-        json.dump(webfinger, webfinger_fileobj, indent=2)
+    well_known = ctx.instance_files_path / ".well-known"
+    dump(webfinger, well_known / "webfinger")
 
 
-def create_followers(config) -> None:
+def create_followers(ctx: RunContext) -> None:
     "Creates 'Followers' endpoint"
-    domain = config["Instance"].get("domain")
     followers_object = {
-        "@context": "https://www.w3.org/ns/activitystreams",
-        "id": f"{domain}/followers",
+        "@context": ACTIVITYSTREAMS_CONTEXT,
+        "id": f"{ctx.domain}/followers",
         "type": "OrderedCollection",
-        "totalItems": config["Actor"].get("followers"),
+        "totalItems": ctx.config["Actor"].get("followers"),
         "first": [],
     }
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    with (instance_files_path / "followers").open(
-        "w", encoding="utf-8"
-    ) as followers_fileobj:
-        json.dump(followers_object, followers_fileobj, indent=2)
+    dump(followers_object, ctx.instance_files_path / "followers")
 
 
-def create_following(config) -> None:
+def create_following(ctx: RunContext) -> None:
     "Creates 'Following' endpoint"
-    domain = config["Instance"].get("domain")
     following_object = {
-        "@context": "https://www.w3.org/ns/activitystreams",
-        "id": f"{domain}/followers",
+        "@context": ACTIVITYSTREAMS_CONTEXT,
+        "id": f"{ctx.domain}/followers",
         "type": "OrderedCollection",
-        "totalItems": config["Actor"].get("following"),
+        "totalItems": ctx.config["Actor"].get("following"),
         "first": [],
     }
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    with (instance_files_path / "following").open(
-        "w", encoding="utf-8"
-    ) as following_fileobj:
-        json.dump(following_object, following_fileobj, indent=2)
+    dump(following_object, ctx.instance_files_path / "following")
 
 
 def create_outbox(
-    config: ConfigParser, /, notes: List[GenericObjectType]
+    ctx: RunContext, /, activities: List[GenericObjectType]
 ) -> None:
-    "Creates 'Outbox' endpoint"
-    notes_sorted = sorted(
-        notes,
-        # We need to cast(str, published) to match str_to_datetime type
-        # Also we need str_to_datetime because MyPy expects a key-func value
-        # that supports cmp-lt and cmp-gt.
-        key=lambda note: str_to_datetime(cast(str, note.get("published"))),
+    """
+    Creates 'Outbox' endpoint
+    * Receives the 'Create' Activities built by create_posts()
+    """
+    activities_sorted = sorted(
+        activities,
+        # published is validated against PUBLISHED_FORMAT by parse_notes(),
+        # which is fixed-width, so the string sorts chronologically.
+        key=itemgetter("published"),
         reverse=True,
     )
-    paginate_by = int(config["Outbox"].get("paginate_by", "0"))
-    if paginate_by and len(notes_sorted) > paginate_by:
-        notes_sorted = notes_sorted[:paginate_by]
-    items_collection = [
-        generate_create_activity(config, note=note) for note in notes_sorted
-    ]
-
-    domain = config["Instance"].get("domain")
-    toots = {
-        "@context": "https://www.w3.org/ns/activitystreams",
-        "id": f"{domain}/toots",
-        "type": "OrderedCollectionPage",
-        "prev": f"{domain}/toots",
-        "partOf": f"{domain}/toots",
-        "totalItems": len(items_collection),
-        "orderedItems": items_collection,
-    }
+    # No pagination means a single page holding every note
+    paginate_by = int(ctx.config["Outbox"].get("paginate_by", "0")) or max(
+        len(activities_sorted), 1
+    )
+    pages = [
+        activities_sorted[index:index + paginate_by]
+        for index in range(0, len(activities_sorted), paginate_by)
+    ] or [[]]
+    domain = ctx.domain
+
+    # Toots pages are used by Mastodon, each one is written on its own
+    for page_number, page_activities in enumerate(pages, start=1):
+        toots: GenericObjectType = {
+            "@context": ACTIVITYSTREAMS_CONTEXT,
+            "id": f"{domain}/toots-{page_number}",
+            "type": "OrderedCollectionPage",
+            "partOf": f"{domain}/outbox",
+            "orderedItems": page_activities,
+        }
+        if page_number > 1:
+            toots["prev"] = f"{domain}/toots-{page_number - 1}"
+        if page_number < len(pages):
+            toots["next"] = f"{domain}/toots-{page_number + 1}"
+        dump(toots, ctx.instance_files_path / f"toots-{page_number}")
+
+    # Pages left over from a previous (longer) run would still be served
+    for stale_page in ctx.instance_files_path.glob("toots-*"):
+        page_number_str = stale_page.name.removeprefix("toots-")
+        if page_number_str.isdigit() and int(page_number_str) > len(pages):
+            stale_page.unlink()
+    # and so would the single page Outbox of older versions
+    (ctx.instance_files_path / "toots").unlink(missing_ok=True)
+
+    # and Outbox to complain with the Spec
     outbox = {
-        "@context": "https://www.w3.org/ns/activitystreams",
+        "@context": ACTIVITYSTREAMS_CONTEXT,
         "id": f"{domain}/outbox",
         "type": "OrderedCollection",
-        "totalItems": len(items_collection),
-        "first": f"{domain}/toots"
+        "totalItems": len(activities_sorted),
+        "first": f"{domain}/toots-1",
+        "last": f"{domain}/toots-{len(pages)}",
     }
-
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    # Toots is used by Mastodon
-    with (instance_files_path / "toots").open(
-        "w", encoding="utf-8"
-    ) as toots_fileobj:
-        json.dump(toots, toots_fileobj, indent=2)
-    # and Outbox to complain with the Spec
-    with (instance_files_path / "outbox").open(
-        "w", encoding="utf-8"
-    ) as outbox_fileobj:
-        json.dump(outbox, outbox_fileobj, indent=2)
+    dump(outbox, ctx.instance_files_path / "outbox")
 
 
 def create_posts(
-    config: ConfigParser, /,
-    notes: List[GenericObjectType],
-    featured_note: Path
-) -> None:
-    "Creates 'Posts' endpoint for each Note"
+    ctx: RunContext, /,
+    notes: Iterable[GenericObjectType]
+) -> List[GenericObjectType]:
+    """
+    Creates 'Posts' endpoint for each Note
+    * Notes are written as they come, so a generator can be passed
+    * Returns the 'Create' Activity of each one (for the Outbox)
+    """
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    posts = instance_files_path / "posts"
-    for note in notes:
-        filename: str = cast(str, note.get("filename"))
-        note_id, _ = filename.rsplit(".", 1)
-        with (posts / note_id).open(
-            "w", encoding="utf-8"
-        ) as note_fileobj:
-            json.dump(note, note_fileobj, indent=2)
+    posts = ctx.instance_files_path / "posts"
+    activities: List[GenericObjectType] = []
+    post_paths: Set[Path] = set()
+    # Each post is an independent file, overlap the writes (and the parsing)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        writes = []
+        for note in notes:
+            note_id, _ = cast(str, note["filename"]).rsplit(".", 1)
+            post_path = posts / note_id
+            # Two entries with the same name would race on the same file
+            if post_path in post_paths:
+                print(
+                    f"[!] Duplicated post: {note['filename']!r} -> "
+                    f"another entry is also written to {str(post_path)!r}"
+                )
+                raise ValueError(f"Duplicated post: {post_path}")
+            post_paths.add(post_path)
+            writes.append(executor.submit(dump, note, post_path))
+            activities.append(
+                generate_create_activity(ctx.actor_id, note=note)
+            )
+        # so any exception raised by a worker propagates
+        for write in writes:
+            write.result()
 
-    # If there's one defined, also the featured endpoint (for Mastodon)
-    if featured_note.is_file():
-        create_featured(
-            config,
-            pseudo_featured_note_path=featured_note
-        )
+    return activities
 
 
-def create_featured(config, /, pseudo_featured_note_path: Path) -> None:
+def create_featured(ctx: RunContext, /, note: GenericObjectType) -> None:
     "Creates 'Featured' endpoint"
-    domain = config["Instance"].get("domain")
-    note_object = parse_notes(
-        config,
-        pseudo_note_filename=pseudo_featured_note_path.name,
-        pseudo_note=pseudo_featured_note_path.open("r").readlines(),
-    )
     featured = {
-        "@context": "https://www.w3.org/ns/activitystreams",
-        "id": f"{domain}/featured",
+        "@context": ACTIVITYSTREAMS_CONTEXT,
+        "id": f"{ctx.domain}/featured",
         "type": "OrderedCollection",
         "totalItems": 1,
-        "orderedItems": [note_object],
+        "orderedItems": [note],
     }
 
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
-    with (instance_files_path / "featured").open(
-        "w", encoding="utf-8"
-    ) as featured_fileobj:
-        json.dump(featured, featured_fileobj, indent=2)
+    dump(featured, ctx.instance_files_path / "featured")
 
 
-def create_instance_files(config: ConfigParser) -> None:
+def create_instance_files(ctx: RunContext) -> None:
     "Creates 'Index' endpoint"
-    preferred_username = config["Actor"].get("preferredUsername")
-    host = config["Instance"].get("host")
+    host = ctx.host
     template = f"""<!DOCTYPE html>
 <html lang="en">
 <head><title>StaticPub Instance</title></head>
 <body>
     <p>This is the StaticPub Instance for
-    <strong>@{preferred_username}@{host}</strong>.</p>
+    <strong>@{ctx.preferred_username}@{host}</strong>.</p>
 </body>
 </html>"""
-    instance_files_path = Path(
-        config["Paths"].get("instanceFiles")
-    )
+    instance_files_path = ctx.instance_files_path
     with (instance_files_path / "index.html").open(
         "w", encoding="utf-8"
     ) as index_fileobj:
         index_fileobj.write(template)
 
-    if config["Instance"].getboolean(
-        "github_instance",
+    if getboolean(
+        ctx.config["Instance"].get("github_instance"),
         fallback=True
     ):
         # if it's a github hosted instance we'll need:
@@ -421,7 +500,9 @@ def create_instance_files(config: ConfigParser) -> None:
             "w", encoding="utf-8"
         ) as cname_fileobj:
             cname_fileobj.write(host)
-        with Path("CNAME").open("w", encoding="utf-8") as cname_fileobj:
+        with (ctx.current_dir_path / "CNAME").open(
+            "w", encoding="utf-8"
+        ) as cname_fileobj:
             cname_fileobj.write(host)
         # and a nojekyll to disable Jekyll sites
         # and allow the Webfinger endpoint
@@ -431,40 +512,49 @@ def create_instance_files(config: ConfigParser) -> None:
             nojekyll_fileobj.write(".")
 
 
-def run_staticpub(config: ConfigParser) -> None:
+def run_staticpub(config: Config) -> None:
     "Main StaticPub func. Alpha and Omega"
-    # dirs and featured
-    current_dir_path = Path(config["Paths"].get("curdir"))
-    entries_path = current_dir_path / config["Paths"].get("entries")
-    featured_note = current_dir_path / config["Instance"].get(
-        "featured_note"
-    ).strip()
+    # Everything the endpoints need (including a single _now_) resolved once
+    ctx = get_run_context(config)
+    featured_note_path = ctx.featured_note_path
+    featured_note: GenericObjectType | None = None
+    # Parsed once, generate_notes() reuses it if it's one of the entries
+    if featured_note_path.is_file():
+        featured_note = parse_notes(
+            ctx,
+            pseudo_note_filename=featured_note_path.name,
+            pseudo_note=featured_note_path.read_text(
+                encoding="utf-8"
+            ).splitlines(keepends=True),
+        )
     # First we'll create the dir where we'll store everything
-    users_endpoint_path = (
-        current_dir_path / config["Paths"].get("instanceFiles")
-    )
-    mkdir(users_endpoint_path)
-    mkdir(users_endpoint_path / "posts")
-    mkdir(users_endpoint_path / ".well-known")
+    mkdir(ctx.instance_files_path)
+    mkdir(ctx.instance_files_path / "posts")
+    mkdir(ctx.instance_files_path / ".well-known")
     # Just an index file (and .nojekyll if its github hosted)
-    create_instance_files(config)
+    create_instance_files(ctx)
     # Create the user, its banner/icon (if any) and its webfinger endpoints
     create_actor(
-        config,
-        has_featured_note=featured_note.is_file()
+        ctx,
+        has_featured_note=featured_note is not None
     )
-    create_webfinger(config)
+    create_webfinger(ctx)
     # Followers and following
-    create_following(config)
-    create_followers(config)
+    create_following(ctx)
+    create_followers(ctx)
     # Finally posts and outbox
-    notes_generator = list(generate_notes(config, entries_path))
-    create_posts(
-        config,
-        notes=notes_generator,
-        featured_note=featured_note
+    activities = create_posts(
+        ctx,
+        notes=generate_notes(
+            ctx,
+            ctx.entries_path,
+            {featured_note_path: featured_note} if featured_note else {}
+        )
     )
-    create_outbox(config, notes=notes_generator)
+    # If there's one defined, also the featured endpoint (for Mastodon)
+    if featured_note is not None:
+        create_featured(ctx, note=featured_note)
+    create_outbox(ctx, activities=activities)
 
 
 if __name__ == "__main__":